@@ -1,90 +1,303 @@
 import streamlit as st
 import sqlite3
-import pandas as pd
-import qrcode
+import segno
 from PIL import Image
 import io
+import base64
+import hashlib
+import hmac
 import os
+import threading
 
 # --- CONFIGURATION ---
 # In a real app, use st.secrets for passwords
-ADMIN_PASSWORD = "Admin#1520" 
+# scrypt(n=16384, r=8, p=1) hash of the admin password; the plaintext is not stored
+ADMIN_SALT = bytes.fromhex("ff0f74f18d2b6140fa2444bf371001ac")
+ADMIN_HASH = bytes.fromhex(
+    "874c7193fc936641f93995e4fb4dfd4eb45348b427739ee827442205259c7d27"
+    "6adee21c239d0e21876ee3262c19ef46d3bdd559fb39f58f409fc63a98c6c047"
+)
 DB_FILE = "employee_db.sqlite"
 IMAGE_FOLDER = "employee_photos"
 
+# 150x150 gray square shown when an employee has no photo
+_PLACEHOLDER_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAJYAAACWCAAAAAAZai4+AAAAc0lEQVR42u3OMQEAAAwCIPtnM5Qddu2ABKQvRUtLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tLS0tL62J9Wg3L74AmbAAAAABJRU5ErkJggg=="
+)
+
 # Ensure image folder exists
 if not os.path.exists(IMAGE_FOLDER):
     os.makedirs(IMAGE_FOLDER)
 
 # --- DATABASE FUNCTIONS ---
+@st.cache_resource
+def get_conn():
+    """Open one long-lived SQLite connection shared across reruns and sessions."""
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@st.cache_resource
+def get_write_lock():
+    """Lock used to serialize writers on the shared connection."""
+    return threading.Lock()
+
 def init_db():
     """Initialize the SQLite database if it doesn't exist."""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            email TEXT,
-            phone TEXT,
-            domain TEXT,
-            linkedin TEXT,
-            photo_path TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def add_employee(name, email, phone, domain, linkedin, photo_path):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO employees (name, email, phone, domain, linkedin, photo_path)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (name, email, phone, domain, linkedin, photo_path))
-    conn.commit()
-    conn.close()
+    conn = get_conn()
+    with get_write_lock():
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS employees (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                email TEXT,
+                phone TEXT,
+                domain TEXT,
+                linkedin TEXT,
+                photo_path TEXT,
+                thumb_path TEXT
+            )
+        ''')
+        # Older databases were created before thumbnails were stored
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(employees)")]
+        if 'thumb_path' not in columns:
+            conn.execute("ALTER TABLE employees ADD COLUMN thumb_path TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_emp_name ON employees(name COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_emp_domain ON employees(domain COLLATE NOCASE)")
+
+def add_employee(name, email, phone, domain, linkedin, photo_path, thumb_path=None):
+    return add_employees_bulk([(name, email, phone, domain, linkedin, photo_path, thumb_path)])
+
+def _insert_employees(conn, rows):
+    """Insert rows in one transaction and return the last new id; the caller holds the write lock."""
+    # The connection is in autocommit mode, so open the transaction explicitly
+    conn.execute("BEGIN")
+    try:
+        conn.executemany('''
+            INSERT INTO employees (name, email, phone, domain, linkedin, photo_path, thumb_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        conn.execute("COMMIT")
+    except:
+        conn.execute("ROLLBACK")
+        raise
+    return last_id
+
+def add_employees_bulk(rows):
+    """Insert many employee rows in a single transaction and return the last new id."""
+    if not rows:
+        return None
+    conn = get_conn()
+    try:
+        with get_write_lock():
+            last_id = _insert_employees(conn, rows)
+    finally:
+        # Readers share this connection, so they may have cached rows from the open
+        # transaction; clear caches on rollback as well as on commit
+        _invalidate()
+    return last_id
+
+def add_employee_with_photo(name, email, phone, domain, linkedin, data, file_ext):
+    """Save an uploaded photo and thumbnail, insert the employee, return (emp_id, photo_path, thumb_path)."""
+    # Name the file by a hash of its contents so identical uploads share one file
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    save_path = os.path.join(IMAGE_FOLDER, f"{digest}.{file_ext}")
+    conn = get_conn()
+    try:
+        with get_write_lock():
+            # Files are shared by content hash, so reuse/write them and insert under the same
+            # lock delete_employee holds; a concurrent delete can't then remove them in between
+            if not os.path.exists(save_path):
+                with open(save_path, "wb") as f:
+                    f.write(data)
+
+            thumb_path = save_path + ".thumb.jpg"
+            if not os.path.exists(thumb_path):
+                try:
+                    thumb_path = save_thumb(save_path)
+                except Exception as e:
+                    st.warning(f"Could not create thumbnail: {e}")
+                    thumb_path = None
+
+            emp_id = _insert_employees(conn, [(name, email, phone, domain, linkedin, save_path, thumb_path)])
+    finally:
+        _invalidate()
+    return emp_id, save_path, thumb_path
 
 def delete_employee(emp_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Get photo path to delete file from storage
-    c.execute("SELECT photo_path FROM employees WHERE id=?", (emp_id,))
-    result = c.fetchone()
-    if result and result[0] and os.path.exists(result[0]):
-        try:
-            os.remove(result[0])
-        except Exception as e:
-            st.warning(f"Could not delete image file: {e}")
-    
-    c.execute("DELETE FROM employees WHERE id=?", (emp_id,))
-    conn.commit()
-    conn.close()
+    conn = get_conn()
+    with get_write_lock():
+        # Get photo and thumbnail paths to delete files from storage
+        result = conn.execute("SELECT photo_path, thumb_path FROM employees WHERE id=?", (emp_id,)).fetchone()
+        # Photos are content-addressed, so another employee may share the same files
+        shared = result and conn.execute(
+            "SELECT 1 FROM employees WHERE photo_path=? AND id<>? LIMIT 1", (result[0], emp_id)
+        ).fetchone()
+        for path in (() if shared else (result or ())):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    st.warning(f"Could not delete image file: {e}")
 
-def get_all_employees():
-    conn = sqlite3.connect(DB_FILE)
+        conn.execute("DELETE FROM employees WHERE id=?", (emp_id,))
+    _invalidate()
+
+EMPLOYEE_COLUMNS = "id, name, email, phone, domain, linkedin, photo_path, thumb_path"
+
+def _read_employees(query, params=()):
+    """Run a query and return plain row tuples in EMPLOYEE_COLUMNS order."""
     try:
-        df = pd.read_sql_query("SELECT * FROM employees", conn)
+        rows = get_conn().execute(query, params).fetchall()
     except:
-        df = pd.DataFrame()
-    conn.close()
-    return df
+        rows = []
+    return rows
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_all_employees():
+    return _read_employees(f"SELECT {EMPLOYEE_COLUMNS} FROM employees")
+
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def search_employees(search):
+    """Return employees whose name or domain contains `search`, case-insensitively."""
+    # Filtered in Python: SQLite's LIKE/NOCASE only fold ASCII, so "élodie" wouldn't match "Élodie"
+    q = search.casefold()
+    return [
+        row for row in get_all_employees()
+        if q in (row[1] or "").casefold() or q in (row[4] or "").casefold()
+    ]
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _photo_mtimes():
+    """Filename -> mtime for the image folder, so rendering needs no per-card stat."""
+    with os.scandir(IMAGE_FOLDER) as entries:
+        return {entry.name: entry.stat().st_mtime for entry in entries if entry.is_file()}
+
+@st.cache_resource
+def _write_counter():
+    """Count of writes shared by all sessions, used to spot stale per-session copies."""
+    return {'n': 0}
+
+def _invalidate():
+    """Drop cached employee data after a write."""
+    get_all_employees.clear()
+    search_employees.clear()
+    _photo_mtimes.clear()
+    with get_write_lock():
+        _write_counter()['n'] += 1
+
+def _patch_emp_rows(version_before, update):
+    """Apply this session's own write to its emp_rows, or drop the copy if anyone else wrote meanwhile."""
+    if (st.session_state.get('emp_rows_version') == version_before
+            and _write_counter()['n'] == version_before + 1):
+        st.session_state.emp_rows = update(st.session_state.emp_rows)
+        st.session_state.emp_rows_version = version_before + 1
+    else:
+        st.session_state.pop('emp_rows', None)
 
 # --- HELPER FUNCTIONS ---
-def generate_qr(data):
-    """Generates a QR code image from a string."""
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    return img
+@st.cache_data(max_entries=1024, show_spinner=False)
+def qr_png_bytes(payload: str) -> bytes:
+    """Generates a QR code for a string and returns it as PNG bytes."""
+    buf = io.BytesIO()
+    segno.make_qr(payload, error='l', boost_error=False).save(buf, kind='png', scale=10, border=4)
+    return buf.getvalue()
+
+def _thumb_jpeg(path):
+    """Decodes a photo at reduced size and returns a 150px JPEG thumbnail as bytes."""
+    img = Image.open(path)
+    img.draft('RGB', (300, 300))
+    # Convert before resizing so palette images get a smooth resample, not nearest-neighbour
+    img = img.convert('RGB')
+    img.thumbnail((150, 150))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def load_thumb(path: str, mtime: float) -> bytes:
+    """Cached thumbnail for photos that have no stored thumbnail file."""
+    # mtime is only part of the cache key, so a replaced photo gets re-thumbnailed
+    return _thumb_jpeg(path)
+
+def save_thumb(path):
+    """Writes a 150px JPEG thumbnail next to an uploaded photo and returns its path."""
+    thumb_path = path + ".thumb.jpg"
+    with open(thumb_path, "wb") as f:
+        f.write(_thumb_jpeg(path))
+    return thumb_path
+
+def check_admin_password(password):
+    """Compares a password against ADMIN_HASH in constant time."""
+    digest = hashlib.scrypt(password.encode(), salt=ADMIN_SALT, n=16384, r=8, p=1)
+    return hmac.compare_digest(digest, ADMIN_HASH)
 
 # --- MAIN APP ---
+@st.fragment
+def public_view():
+    """Search box and member cards; reruns on its own when the search changes."""
+    rows = get_all_employees()
+    
+    if not rows:
+        st.info("No employees found in the database. Please ask an Admin to add records.")
+    else:
+        # Search bar
+        search = st.text_input("🔍 Search by Name or Domain", placeholder="e.g. Name or Domain")
+        
+        # Filter logic
+        if search:
+            rows = search_employees(search)
+
+        st.write(f"Showing {len(rows)} employees")
+        st.markdown("---")
+
+        # Constructing data strings for QR
+        payloads = [
+            f"Name: {name}\n"
+            f"Title: {domain}\n"
+            f"Email: {email}\n"
+            f"Phone: {phone}"
+            for _, name, email, phone, domain, _, _, _ in rows
+        ]
+
+        photo_files = _photo_mtimes()
+        # Display Cards
+        for (_, name, _, _, domain, _, photo_path, thumb_path), qr_png in zip(rows, map(qr_png_bytes, payloads)):
+            with st.container():
+                col1, col2, col3 = st.columns([1, 2, 1])
+                
+                # Col 1: Photo
+                with col1:
+                    if thumb_path and os.path.basename(thumb_path) in photo_files:
+                        # The folder listing is cached, so the file may have gone since
+                        try:
+                            st.image(thumb_path, width=150, caption="Employee Photo")
+                        except:
+                            st.error("Error loading image")
+                    elif photo_path and os.path.basename(photo_path) in photo_files:
+                        # Records added before thumbnails were stored
+                        try:
+                            thumb = load_thumb(photo_path, photo_files[os.path.basename(photo_path)])
+                            st.image(thumb, width=150, caption="Employee Photo")
+                        except:
+                            st.error("Error loading image")
+                    else:
+                        st.image(_PLACEHOLDER_PNG, width=150, caption="No Image")
+
+                # Col 2: Details
+                with col2:
+                    st.subheader(f"{name}")
+                    st.text(f"{domain}")
+                    
+
+                # Col 3: QR Code
+                with col3:
+                    st.image(qr_png, caption="Scan for Contact Info", width=150)
+                
+                st.markdown("---")
+
 def main():
     st.set_page_config(page_title="SuperX-Members", layout="wide")
     
@@ -99,71 +312,23 @@ def main():
     # --- PUBLIC VIEW (Read Only) ---
     if menu == "Public View":
         st.header("Member Directory")
-        
-        df = get_all_employees()
-        
-        if df.empty:
-            st.info("No employees found in the database. Please ask an Admin to add records.")
-        else:
-            # Search bar
-            search = st.text_input("🔍 Search by Name or Domain", placeholder="e.g. Name or Domain")
-            
-            # Filter logic
-            if search:
-                mask = df['name'].str.contains(search, case=False, na=False) | \
-                       df['domain'].str.contains(search, case=False, na=False)
-                df = df[mask]
-
-            st.write(f"Showing {len(df)} employees")
-            st.markdown("---")
-
-            # Display Cards
-            for index, row in df.iterrows():
-                with st.container():
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    
-                    # Col 1: Photo
-                    with col1:
-                        if row['photo_path'] and os.path.exists(row['photo_path']):
-                            try:
-                                image = Image.open(row['photo_path'])
-                                st.image(image, width=150, caption="Employee Photo")
-                            except:
-                                st.error("Error loading image")
-                        else:
-                            st.image("https://via.placeholder.com/150", width=150, caption="No Image")
-
-                    # Col 2: Details
-                    with col2:
-                        st.subheader(f"{row['name']}")
-                        st.text(f"{row['domain']}")
-                        
-
-                    # Col 3: QR Code
-                    with col3:
-                        # Constructing data string for QR
-                        qr_info = (
-                            f"Name: {row['name']}\n"
-                            f"Title: {row['domain']}\n"
-                            f"Email: {row['email']}\n"
-                            f"Phone: {row['phone']}"
-                        )
-                        qr_img = generate_qr(qr_info)
-                        
-                        # Convert PIL image to bytes for display
-                        buf = io.BytesIO()
-                        qr_img.save(buf)
-                        st.image(buf, caption="Scan for Contact Info", width=150)
-                    
-                    st.markdown("---")
+        public_view()
 
     # --- ADMIN PORTAL (Add/Delete) ---
     elif menu == "Admin Portal":
         st.header("Admin Portal")
-        password = st.sidebar.text_input("Enter Admin Password", type="password")
+        password = None
+        # Once authenticated, later reruns skip the password hash entirely
+        if not st.session_state.get('is_admin'):
+            password = st.sidebar.text_input("Enter Admin Password", type="password")
+            if password and check_admin_password(password):
+                st.session_state.is_admin = True
         
-        if password == ADMIN_PASSWORD:
+        if st.session_state.get('is_admin'):
             st.sidebar.success("Authentication Successful")
+            if st.sidebar.button("Log Out"):
+                st.session_state.is_admin = False
+                st.rerun()
             
             tab1, tab2 = st.tabs(["➕ Add Employee", "❌ Remove Employee"])
             
@@ -185,16 +350,15 @@ def main():
                     
                     if submitted:
                         if name and email and photo:
+                            version_before = _write_counter()['n']
                             # Save Image Locally
-                            file_ext = photo.name.split(".")[-1]
-                            # Sanitize filename
-                            safe_name = "".join([c for c in name if c.isalpha() or c.isdigit()]).rstrip()
-                            save_path = os.path.join(IMAGE_FOLDER, f"{safe_name}_{phone}.{file_ext}")
-                            
-                            with open(save_path, "wb") as f:
-                                f.write(photo.getbuffer())
-                            
-                            add_employee(name, email, phone, domain, linkedin, save_path)
+                            file_ext = photo.name.split(".")[-1].lower()
+                            emp_id, save_path, thumb_path = add_employee_with_photo(
+                                name, email, phone, domain, linkedin, photo.getbuffer(), file_ext
+                            )
+                            # Keep the admin's cached list in step without refetching it
+                            new_row = (emp_id, name, email, phone, domain, linkedin, save_path, thumb_path)
+                            _patch_emp_rows(version_before, lambda rows: rows + [new_row])
                             st.success(f"Employee '{name}' added successfully!")
                             st.rerun()
                         else:
@@ -203,15 +367,22 @@ def main():
             # Tab 2: Delete Employee
             with tab2:
                 st.subheader("Remove Employee")
-                df = get_all_employees()
-                if not df.empty:
+                # Refetch when any session has written since this copy was taken
+                version = _write_counter()['n']
+                if 'emp_rows' not in st.session_state or st.session_state.get('emp_rows_version') != version:
+                    st.session_state.emp_rows = get_all_employees()
+                    st.session_state.emp_rows_version = version
+                rows = st.session_state.emp_rows
+                if rows:
                     # Create a dictionary for the selectbox: "Name (Email)" -> ID
-                    emp_options = {f"{row['name']} | {row['domain']}": row['id'] for index, row in df.iterrows()}
+                    emp_options = {f"{row[1]} | {row[4]}": row[0] for row in rows}
                     selected_emp_label = st.selectbox("Select Employee to Delete", list(emp_options.keys()))
                     
                     if st.button("Delete Selected Employee", type="primary"):
                         emp_id = emp_options[selected_emp_label]
+                        version_before = _write_counter()['n']
                         delete_employee(emp_id)
+                        _patch_emp_rows(version_before, lambda rows: [row for row in rows if row[0] != emp_id])
                         st.success("Employee record deleted.")
                         st.rerun()
                 else: